@@ -1,4 +1,4 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import torch
@@ -11,6 +11,11 @@ import json
 import numpy as np
 import os
 from pathlib import Path
+import asyncio
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 app = FastAPI(title="Sentiment Analysis API")
 
@@ -55,10 +60,43 @@ async def startup_event():
     load_model()
 
 # Reddit API configuration
-reddit = praw.Reddit(
-    client_id="rCH0lxtLd8gqBP-P1TpZZg",
-    client_secret="8GFwdyeCA26YTuqb4eNNsaSrVVjjRQ",
-    user_agent="fyp_sentiment_app by u/No_Drama5439"
+# The base URLs can be overridden to point PRAW at a local stub server that
+# replays recorded responses (e.g. comment-tree fixtures).
+REDDIT_OAUTH_URL = os.getenv("REDDIT_OAUTH_URL", "https://oauth.reddit.com")
+REDDIT_URL = os.getenv("REDDIT_URL", "https://www.reddit.com")
+
+def create_reddit_client():
+    return praw.Reddit(
+        client_id="rCH0lxtLd8gqBP-P1TpZZg",
+        client_secret="8GFwdyeCA26YTuqb4eNNsaSrVVjjRQ",
+        user_agent="fyp_sentiment_app by u/No_Drama5439",
+        oauth_url=REDDIT_OAUTH_URL,
+        reddit_url=REDDIT_URL,
+    )
+
+reddit = create_reddit_client()
+
+# Comment trees are fetched on a dedicated thread pool. PRAW is not thread
+# safe, so every worker thread lazily creates and reuses its own client.
+COMMENT_FETCH_WORKERS = 8
+comment_fetch_executor = ThreadPoolExecutor(
+    max_workers=COMMENT_FETCH_WORKERS,
+    thread_name_prefix="reddit-comments",
+)
+_worker_state = threading.local()
+
+def get_worker_reddit():
+    client = getattr(_worker_state, "reddit", None)
+    if client is None:
+        client = create_reddit_client()
+        _worker_state.reddit = client
+    return client
+
+# Comment scoring runs on a single dedicated thread so BERT inference never
+# blocks the event loop and the model is never used from two threads at once.
+scoring_executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="sentiment-scoring",
 )
 
 class TextRequest(BaseModel):
@@ -72,7 +110,7 @@ async def root():
         "device": str(device),
         "endpoints": {
             "/predict": "POST - Analyze sentiment of text",
-            "/reddit/{query}": "GET - Analyze Reddit posts",
+            "/reddit/{query}": "GET - Analyze Reddit posts (add ?comments=true to analyze comment trees)",
             "/docs": "GET - API documentation"
         }
     }
@@ -99,6 +137,18 @@ async def predict_sentiment(request: TextRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def predict_sentiment_batch(texts: List[str], batch_size: int = 32):
+    """Score texts in padded batches and return one probability list per text."""
+    probabilities = []
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], return_tensors='pt', truncation=True, padding=True, max_length=128)
+        inputs = {key: val.to(device) for key, val in inputs.items()}
+
+        with torch.no_grad():
+            logits = model(**inputs).logits
+            probabilities.extend(torch.softmax(logits, dim=1).cpu().numpy().tolist())
+    return probabilities
+
 @app.post("/api/analyze-batch")
 async def analyze_batch(file: UploadFile = File(...)):
     try:
@@ -121,8 +171,157 @@ async def analyze_batch(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def fetch_comment_stream(post_id: str, max_more: int, max_depth: int, max_comments: int):
+    """Fetch one post's comment tree and flatten it breadth-first.
+
+    MoreComments placeholders are expanded while walking the tree, so only
+    placeholders within ``max_depth`` (top-level comments are depth 0) spend
+    the ``max_more`` expansion budget. The initial fetch and the stream are
+    both capped at ``max_comments`` comments. Runs on a worker thread.
+    """
+    submission = get_worker_reddit().submission(id=post_id)
+    submission.comment_sort = "top"
+    submission.comment_limit = max_comments
+
+    comments = []
+    expansions = 0
+    # Expanded comments arrive as a flat list; nested ones are attached to
+    # their parent here and queued when that parent is visited.
+    expanded_replies = {}
+    queue = deque((comment, 0, None) for comment in submission.comments)
+    while queue and len(comments) < max_comments:
+        comment, depth, thread_id = queue.popleft()
+        if isinstance(comment, praw.models.MoreComments):
+            if expansions >= max_more:
+                continue
+            expansions += 1
+
+            expanded = comment.comments()
+            expanded_ids = {item.id for item in expanded}
+            siblings = []
+            for item in expanded:
+                parent_id = item.parent_id.split("_", 1)[1]
+                if parent_id in expanded_ids:
+                    expanded_replies.setdefault(parent_id, []).append(item)
+                else:
+                    siblings.append(item)
+            # Visit the placeholder's siblings next to keep the walk level-ordered
+            queue.extendleft((item, depth, thread_id) for item in reversed(siblings))
+            continue
+
+        thread_id = thread_id or comment.id
+        body = (comment.body or "").strip()
+        if body and body not in ("[deleted]", "[removed]"):
+            comments.append({
+                "post_id": post_id,
+                "thread_id": thread_id,
+                "depth": depth,
+                "score": comment.score,
+                "text": body,
+            })
+
+        if depth < max_depth:
+            replies = list(comment.replies) + expanded_replies.pop(comment.id, [])
+            queue.extend((reply, depth + 1, thread_id) for reply in replies)
+    return comments
+
+def comment_weight(score: int) -> float:
+    """Weight a comment in the sentiment aggregates by its Reddit score.
+
+    A comment scored 0 has weight 1. Upvotes add weight logarithmically so a
+    single viral comment cannot drown out the rest of a thread, and downvotes
+    shrink the weight towards 0 the further a comment is downvoted.
+    """
+    if score >= 0:
+        return 1 + math.log1p(score)
+    return 1 / (1 + math.log1p(-score))
+
+def aggregate_comment_sentiment(comments):
+    if not comments:
+        return {"count": 0, "weight": 0.0, "sentiment": None, "probabilities": None}
+
+    weights = np.array([comment_weight(comment["score"]) for comment in comments], dtype=float)
+    probabilities = np.array([comment["probabilities"] for comment in comments])
+    weighted = weights @ probabilities / weights.sum()
+    return {
+        "count": len(comments),
+        "weight": float(weights.sum()),
+        "sentiment": int(np.argmax(weighted)),
+        "probabilities": weighted.tolist(),
+    }
+
+def summarize_post_comments(comments):
+    threads = {}
+    for comment in comments:
+        threads.setdefault(comment["thread_id"], []).append(comment)
+
+    summary = aggregate_comment_sentiment(comments)
+    summary["threads"] = [
+        {"id": thread_id, **aggregate_comment_sentiment(thread)}
+        for thread_id, thread in threads.items()
+    ]
+    return summary
+
+async def analyze_comment_trees(post_ids: List[str], max_more: int, max_depth: int, max_comments: int, batch_size: int):
+    """Fetch comment trees concurrently and score them as one shared stream.
+
+    Comments from whichever trees arrive first are pooled and scored in full
+    batches while the remaining fetches are still in flight.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def fetch(post_id):
+        try:
+            comments = await loop.run_in_executor(
+                comment_fetch_executor, fetch_comment_stream, post_id, max_more, max_depth, max_comments
+            )
+            return post_id, comments
+        except Exception as fetch_error:
+            print(f"Error fetching comments for post {post_id}: {str(fetch_error)}")
+            return post_id, None
+
+    scored = {}
+    pending = []
+
+    async def score(comments):
+        probabilities = await loop.run_in_executor(
+            scoring_executor, predict_sentiment_batch, [comment["text"] for comment in comments], batch_size
+        )
+        for comment, comment_probabilities in zip(comments, probabilities):
+            comment["probabilities"] = comment_probabilities
+
+    for next_tree in asyncio.as_completed([fetch(post_id) for post_id in post_ids]):
+        post_id, comments = await next_tree
+        scored[post_id] = comments
+        if comments:
+            pending.extend(comments)
+        while len(pending) >= batch_size:
+            await score(pending[:batch_size])
+            pending = pending[batch_size:]
+    if pending:
+        await score(pending)
+
+    summaries = {}
+    for post_id, comments in scored.items():
+        if comments is None:
+            summaries[post_id] = {"error": "Failed to fetch comments"}
+        else:
+            summaries[post_id] = summarize_post_comments(comments)
+
+    all_comments = [comment for comments in scored.values() if comments for comment in comments]
+    return summaries, aggregate_comment_sentiment(all_comments)
+
 @app.get("/reddit/{query}")
-async def analyze_reddit(query: str, limit: int = 30):
+async def analyze_reddit(
+    query: str,
+    limit: int = 30,
+    comments: bool = False,
+    comment_posts: int = Query(5, ge=1, le=25),
+    max_more: int = Query(8, ge=0, le=32),
+    max_depth: int = Query(4, ge=0, le=10),
+    max_comments: int = Query(500, ge=1, le=500),
+    batch_size: int = Query(32, ge=1, le=128),
+):
     if not query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
         
@@ -140,6 +339,7 @@ async def analyze_reddit(query: str, limit: int = 30):
                 sentiment_result = await predict_sentiment(TextRequest(text=post.title))
                 
                 posts.append({
+                    "id": post.id,
                     "title": post.title,
                     "url": post.url,
                     "score": post.score,
@@ -153,10 +353,24 @@ async def analyze_reddit(query: str, limit: int = 30):
         
         if not posts:
             print(f"No posts found for query: {query}")  # Debug log
-            return {"results": [], "message": f"No Reddit posts found for: {query}"}
+            response = {"results": [], "message": f"No Reddit posts found for: {query}"}
+            if comments:
+                response["comment_summary"] = aggregate_comment_sentiment([])
+            return response
             
         print(f"Successfully analyzed {len(posts)} posts")  # Debug log
-        return {"results": posts}
+        if not comments:
+            return {"results": posts}
+
+        top_posts = posts[:comment_posts]
+        print(f"Analyzing comment trees for {len(top_posts)} posts")  # Debug log
+        summaries, comment_summary = await analyze_comment_trees(
+            [post["id"] for post in top_posts], max_more, max_depth, max_comments, batch_size
+        )
+        for post in top_posts:
+            post["comments"] = summaries[post["id"]]
+
+        return {"results": posts, "comment_summary": comment_summary}
     except Exception as e:
         error_msg = str(e)
         print(f"Reddit API error: {error_msg}")
@@ -0,0 +1,69 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+FIXTURES_PATH = Path(__file__).parent / 'fixtures'
+
+
+class RedditStubHandler(BaseHTTPRequestHandler):
+    """Replays recorded Reddit API responses keyed by request path."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.startswith("/api/v1/access_token"):
+            self.respond({"access_token": "stub-token", "token_type": "bearer", "expires_in": 3600, "scope": "*"})
+        else:
+            self.replay()
+
+    def do_GET(self):
+        self.replay()
+
+    def replay(self):
+        url = urlsplit(self.path)
+        path = url.path
+        self.server.requests.append((self.command, path, parse_qs(url.query)))
+        if path in self.server.responses:
+            self.respond(self.server.responses[path])
+        else:
+            self.respond({"message": "Not Found", "error": 404}, status=404)
+
+    def respond(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def reddit_stub(monkeypatch):
+    """Serve the recorded comment-tree fixtures and point the backend at them."""
+    import main
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RedditStubHandler)
+    server.responses = json.loads((FIXTURES_PATH / 'comment_tree_abc123.json').read_text())
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setenv("praw_check_for_updates", "False")
+    monkeypatch.setattr(main, "REDDIT_OAUTH_URL", url)
+    monkeypatch.setattr(main, "REDDIT_URL", url)
+    # Worker threads cache their clients; start from fresh ones bound to the stub
+    monkeypatch.setattr(main, "_worker_state", threading.local())
+    yield server
+
+    server.shutdown()
+    server.server_close()
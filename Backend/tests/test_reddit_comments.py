@@ -0,0 +1,182 @@
+import asyncio
+import math
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+POSITIVE = [0.1, 0.1, 0.8, 0.0]
+NEGATIVE = [0.7, 0.1, 0.1, 0.1]
+NEUTRAL = [0.1, 0.8, 0.05, 0.05]
+
+# Breadth-first order of the recorded tree with every placeholder expanded
+FULL_STREAM = [
+    ("c1", 0, 120, "Great news, love it"),
+    ("c2", 0, -8, "This is bad"),
+    ("c3", 0, 5, "Love it"),
+    ("c4", 0, 0, "Meh"),
+    ("c1", 1, 15, "Agree, this is great"),
+    ("c3", 1, 1, "Bad"),
+    ("c1", 2, 3, "Terrible take honestly"),
+    ("c1", 2, -50, "Bad idea, awful"),
+    ("c1", 3, 2, "I love this thread"),
+    ("c1", 4, 7, "Great point"),
+]
+
+
+def stream_of(comments):
+    return [(c["thread_id"], c["depth"], c["score"], c["text"]) for c in comments]
+
+
+def requested_paths(stub):
+    return [(method, path) for method, path, _ in stub.requests]
+
+
+def fake_probabilities(text):
+    text = text.lower()
+    if "love" in text or "great" in text:
+        return POSITIVE
+    if "bad" in text or "terrible" in text or "awful" in text:
+        return NEGATIVE
+    return NEUTRAL
+
+
+def expected_aggregate(stream):
+    weights = [1 + math.log1p(score) if score >= 0 else 1 / (1 + math.log1p(-score)) for _, _, score, _ in stream]
+    total = sum(weights)
+    probabilities = [
+        sum(weight * fake_probabilities(text)[label] for weight, (_, _, _, text) in zip(weights, stream)) / total
+        for label in range(4)
+    ]
+    return total, probabilities
+
+
+@pytest.fixture
+def fake_scorer(monkeypatch):
+    batches = []
+
+    def predict_sentiment_batch(texts, batch_size=32):
+        batches.append((threading.current_thread().name, len(texts)))
+        return [fake_probabilities(text) for text in texts]
+
+    monkeypatch.setattr(main, "predict_sentiment_batch", predict_sentiment_batch)
+    return batches
+
+
+def test_fetch_comment_stream_expands_placeholders_breadth_first(reddit_stub):
+    comments = main.fetch_comment_stream("abc123", max_more=8, max_depth=10, max_comments=500)
+
+    assert stream_of(comments) == FULL_STREAM
+    assert requested_paths(reddit_stub) == [
+        ("GET", "/comments/abc123/"),
+        ("POST", "/api/morechildren/"),
+        ("GET", "/comments/abc123/_/c1a1a"),
+    ]
+
+
+def test_fetch_comment_stream_skips_placeholders_below_max_depth(reddit_stub):
+    comments = main.fetch_comment_stream("abc123", max_more=8, max_depth=2, max_comments=500)
+
+    assert stream_of(comments) == [entry for entry in FULL_STREAM if entry[1] <= 2]
+    # The "continue this thread" placeholder sits at depth 4 and must not spend the budget
+    assert requested_paths(reddit_stub) == [
+        ("GET", "/comments/abc123/"),
+        ("POST", "/api/morechildren/"),
+    ]
+
+
+def test_fetch_comment_stream_respects_expansion_budget(reddit_stub):
+    comments = main.fetch_comment_stream("abc123", max_more=0, max_depth=10, max_comments=500)
+
+    assert [c["text"] for c in comments] == [
+        "Great news, love it",
+        "This is bad",
+        "Agree, this is great",
+        "Terrible take honestly",
+        "Bad idea, awful",
+        "I love this thread",
+    ]
+    assert requested_paths(reddit_stub) == [("GET", "/comments/abc123/")]
+
+
+def test_fetch_comment_stream_caps_comment_count(reddit_stub):
+    comments = main.fetch_comment_stream("abc123", max_more=8, max_depth=10, max_comments=3)
+
+    assert stream_of(comments) == FULL_STREAM[:3]
+    method, path, params = reddit_stub.requests[0]
+    assert (method, path) == ("GET", "/comments/abc123/")
+    assert params["limit"] == ["3"]
+    assert params["sort"] == ["top"]
+
+
+def test_comment_weight_damps_upvotes_and_penalizes_downvotes():
+    assert main.comment_weight(0) == 1
+    assert main.comment_weight(-50) < main.comment_weight(-1) < main.comment_weight(0) < main.comment_weight(1)
+    assert main.comment_weight(10000) < 10 * main.comment_weight(10)
+
+
+def test_analyze_comment_trees_aggregates_per_post_and_thread(reddit_stub, fake_scorer):
+    summaries, comment_summary = asyncio.run(
+        main.analyze_comment_trees(["abc123", "missing"], max_more=8, max_depth=10, max_comments=500, batch_size=4)
+    )
+
+    # Comments are scored off the event loop in shared, full batches
+    assert fake_scorer == [("sentiment-scoring_0", 4), ("sentiment-scoring_0", 4), ("sentiment-scoring_0", 2)]
+    assert summaries["missing"] == {"error": "Failed to fetch comments"}
+
+    post = summaries["abc123"]
+    weight, probabilities = expected_aggregate(FULL_STREAM)
+    assert post["count"] == len(FULL_STREAM)
+    assert post["weight"] == pytest.approx(weight)
+    assert post["probabilities"] == pytest.approx(probabilities)
+    assert post["sentiment"] == 2
+    assert comment_summary == {key: post[key] for key in ("count", "weight", "sentiment", "probabilities")}
+
+    threads = {thread["id"]: thread for thread in post["threads"]}
+    assert list(threads) == ["c1", "c2", "c3", "c4"]
+    for thread_id, thread in threads.items():
+        stream = [entry for entry in FULL_STREAM if entry[0] == thread_id]
+        weight, probabilities = expected_aggregate(stream)
+        assert thread["count"] == len(stream)
+        assert thread["weight"] == pytest.approx(weight)
+        assert thread["probabilities"] == pytest.approx(probabilities)
+    assert [threads[thread_id]["sentiment"] for thread_id in threads] == [2, 0, 2, 1]
+
+
+def test_reddit_endpoint_analyzes_comments_from_stub(reddit_stub, fake_scorer, monkeypatch):
+    post = SimpleNamespace(id="abc123", title="Stub post", url="https://example.com", score=250, subreddit="stub")
+    search = SimpleNamespace(search=lambda *args, **kwargs: [post])
+    monkeypatch.setattr(main, "reddit", SimpleNamespace(subreddit=lambda name: search))
+
+    async def predict_sentiment(request):
+        return {"sentiment": 1, "probabilities": NEUTRAL}
+
+    monkeypatch.setattr(main, "predict_sentiment", predict_sentiment)
+
+    response = TestClient(main.app).get("/reddit/stub", params={"comments": "true", "max_depth": 1})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["results"][0]["comments"]["count"] == 6
+    assert body["comment_summary"]["count"] == 6
+
+
+def test_reddit_endpoint_rejects_unbounded_limits():
+    client = TestClient(main.app)
+
+    for params in ({"max_more": 100000}, {"max_comments": 1000000}, {"comment_posts": 100}, {"batch_size": 0}):
+        response = client.get("/reddit/stub", params={"comments": "true", **params})
+        assert response.status_code == 422
+
+
+def test_reddit_endpoint_returns_comment_summary_without_posts(monkeypatch):
+    search = SimpleNamespace(search=lambda *args, **kwargs: [])
+    monkeypatch.setattr(main, "reddit", SimpleNamespace(subreddit=lambda name: search))
+
+    response = TestClient(main.app).get("/reddit/stub", params={"comments": "true"})
+
+    assert response.status_code == 200
+    assert response.json()["comment_summary"] == main.aggregate_comment_sentiment([])